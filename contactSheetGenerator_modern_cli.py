@@ -9,17 +9,273 @@ from PIL import ImageDraw
 from PIL import ImageFont
 from PIL import ImageOps
 from PIL import ImageFilter
+from PIL import ImageFile
 
 import sys
 import os
+import re
 import subprocess
+import shutil
+import json
+import atexit
+import string
+import threading
+import concurrent.futures
+from functools import lru_cache, partial
 from datetime import datetime
 from io import BytesIO
+from fractions import Fraction
 import time
 import argparse
 import math
 
+try:
+    import pyexiv2
+except ImportError:
+    pyexiv2 = None
+
+try:
+    import rawpy
+except ImportError:
+    rawpy = None
+
+RAW_EXTENSIONS = (".cr2", ".cr3", ".nef", ".arw", ".dng", ".raf", ".orf", ".rw2", ".pef", ".srw")
+
+# Aperture values arrive as "f/F2.8", "f/2.8", "F2.8" or "2.8"
+APERTURE_PREFIX = re.compile(r'^(?:f/F|f/|F)')
+
+# Bottom-line EXIF fields in display order, each with how its value is labelled
+EXIF_BOTTOM_LINE = (
+    ("EXIF_camera", lambda value: value),
+    ("EXIF_ISO", lambda value: value if value.startswith("ISO") else f"ISO {value}"),
+    ("EXIF_shutter", lambda value: f"{value}s" if "/" in value and not value.endswith("s") else value),
+    ("EXIF_aperture", lambda value: "f/" + APERTURE_PREFIX.sub("", value)),
+)
+
+# Transpose that undoes each EXIF Orientation value, as ImageOps.exif_transpose applies it
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# `exiv2 -p a` prints Orientation by name rather than number
+EXIV2_ORIENTATION = {
+    "top, left": 1, "top, right": 2, "bottom, right": 3, "bottom, left": 4,
+    "left, top": 5, "right, top": 6, "right, bottom": 7, "left, bottom": 8,
+}
+
+# Where --strict remembers that dcraw ran successfully
+TOOL_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "rawContactSheetGenerator", "tools.json")
+
+# Static parts of the HTML gallery page
+HTML_HEAD = string.Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$gallery_name</title>
+    <style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+            background-color: #000000;
+            color: #ffffff;
+            margin: 0;
+            padding: 20px;
+        }
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+        }
+        h1 {
+            text-align: center;
+            color: #ffffff;
+            margin-bottom: 30px;
+        }
+        .grid {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 10px;
+            justify-content: center;
+        }
+        .image-container {
+            cursor: pointer;
+            border: 2px solid transparent;
+            transition: border-color 0.2s;
+        }
+        .image-container:hover {
+            border-color: #666666;
+        }
+        .image-container img {
+            display: block;
+            max-width: 100%;
+            height: auto;
+        }
+        .date-range {
+            text-align: center;
+            color: #888;
+            margin-bottom: 30px;
+            font-size: 1.1em;
+        }
+        .timestamp {
+            text-align: center;
+            color: #666;
+            margin-top: 30px;
+            font-size: 0.9em;
+        }
+
+        /* Lightbox styles */
+        .lightbox {
+            display: none;
+            position: fixed;
+            z-index: 1000;
+            left: 0;
+            top: 0;
+            width: 100%;
+            height: 100%;
+            background-color: rgba(0, 0, 0, 0.9);
+            cursor: pointer;
+        }
+        .lightbox-content {
+            position: absolute;
+            top: 50%;
+            left: 50%;
+            transform: translate(-50%, -50%);
+            max-width: 90%;
+            max-height: 90%;
+            object-fit: contain;
+        }
+        .lightbox-close {
+            position: absolute;
+            top: 20px;
+            right: 35px;
+            color: #fff;
+            font-size: 40px;
+            font-weight: bold;
+            cursor: pointer;
+            z-index: 1001;
+        }
+        .lightbox-close:hover {
+            color: #ff9c00;
+        }
+        .lightbox-nav {
+            position: absolute;
+            top: 50%;
+            transform: translateY(-50%);
+            color: #fff;
+            font-size: 30px;
+            font-weight: bold;
+            cursor: pointer;
+            background-color: rgba(0, 0, 0, 0.5);
+            padding: 10px 15px;
+            border-radius: 5px;
+            user-select: none;
+        }
+        .lightbox-nav:hover {
+            color: #ff9c00;
+            background-color: rgba(0, 0, 0, 0.8);
+        }
+        .lightbox-prev {
+            left: 20px;
+        }
+        .lightbox-next {
+            right: 20px;
+        }
+
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>$gallery_name</h1>
+        <div class="date-range" id="date-range"></div>
+        <div class="grid">
+""")
+
+HTML_LIGHTBOX = string.Template("""
+        </div>
+        <div class="timestamp">Generated on $timestamp</div>
+    </div>
+
+    <!-- Lightbox -->
+    <div id="lightbox" class="lightbox" onclick="closeLightbox()">
+        <span class="lightbox-close" onclick="closeLightbox()">&times;</span>
+        <div class="lightbox-nav lightbox-prev" onclick="event.stopPropagation(); previousImage()">&#10094;</div>
+        <div class="lightbox-nav lightbox-next" onclick="event.stopPropagation(); nextImage()">&#10095;</div>
+        <img class="lightbox-content" id="lightbox-image" onclick="event.stopPropagation();">
+
+    </div>
+
+    <script>
+        // Image data for lightbox
+        const images = [""")
+
+HTML_TAIL = string.Template("""
+        ];
+
+        let currentImageIndex = 0;
+
+        function openLightbox(index) {
+            currentImageIndex = index;
+            const lightbox = document.getElementById('lightbox');
+            const lightboxImage = document.getElementById('lightbox-image');
+
+            lightboxImage.src = images[index].src;
+
+            lightbox.style.display = 'block';
+            document.body.style.overflow = 'hidden';
+        }
+
+        function closeLightbox() {
+            document.getElementById('lightbox').style.display = 'none';
+            document.body.style.overflow = 'auto';
+        }
+
+        function nextImage() {
+            currentImageIndex = (currentImageIndex + 1) % images.length;
+            openLightbox(currentImageIndex);
+        }
+
+        function previousImage() {
+            currentImageIndex = (currentImageIndex - 1 + images.length) % images.length;
+            openLightbox(currentImageIndex);
+        }
+
+        // Keyboard navigation
+        document.addEventListener('keydown', function(event) {
+            const lightbox = document.getElementById('lightbox');
+            if (lightbox.style.display === 'block') {
+                switch(event.key) {
+                    case 'Escape':
+                        closeLightbox();
+                        break;
+                    case 'ArrowRight':
+                        nextImage();
+                        break;
+                    case 'ArrowLeft':
+                        previousImage();
+                        break;
+                }
+            }
+        });
+
+        // Set date range
+        const dateRangeElement = document.getElementById('date-range');
+        const dateRange = '$date_range';
+        if (dateRange) {
+            dateRangeElement.textContent = dateRange;
+        }
+    </script>
+</body>
+</html>
+""")
+
 class ContactSheetGenerator(object):
+    toolAvailable = {}  # Tool checks, shared by every generator in the process and filled on first use
+
     def __init__(self, directory_in="", config=None):
         self.contactSheetConfiguration = {
             "directoryIn": directory_in,
@@ -32,18 +288,15 @@ class ContactSheetGenerator(object):
             "histogramHeight": 100,
             "expandPercent": 5,
             "fontColor": "#ff9c00",
-            "useEmbeddedJpg": False,
+            "useEmbeddedJpg": True,
             "expandHistogram": False,
             "sharpen": True,
             "sharpenAmount": 1,
             "format": ["jpg", "tiff", "ppm"],
             "bitDepth": [8],
-            "JPG_Quality": 95,
-            "dcrawOption_extractJPG": [False],
-            "dcrawOption_half": [True],
-            "dcrawOption_quality": [True, 0],
-            "dcrawOption_dontStretchRotatePixels": [True],
-            "dcrawOption_whiteBalance": ["w"],
+            "JPG_Quality": 85,
+            "exportJPG_Quality": 92,
+            "contactSheetFormat": "png",
             "style": ["single", "strip", "grid"],
             "stripLength": 4,
             "gridSize": [2, 5]
@@ -70,7 +323,41 @@ class ContactSheetGenerator(object):
             "EXIF_fileColorSpace": "Exif.Canon.ColorSpace",
             "EXIF_whiteBalance": "Exif.CanonPr.ColorTemperature",
             "EXIF_fileResolutionWidth": "Exif.Image.ImageWidth",
-            "EXIF_fileResolutionHeight": "Exif.Image.ImageHeight"
+            "EXIF_fileResolutionHeight": "Exif.Image.ImageHeight",
+            "EXIF_orientation": "Exif.Image.Orientation"
+        }
+
+        # Match "<tag>  <type>  <count>  <value>" lines of `exiv2 -p a` in one pass
+        self.exifTagToKey = {tag: key for key, tag in self.catchCanonExifTags.items()}
+        self.exifLineRegex = re.compile(r'^(' + '|'.join(re.escape(tag) for tag in self.exifTagToKey) + r')\s+\S+\s+\S+\s+(.*)$')
+
+        # Standard EXIF tag IDs for reading metadata in-process with Pillow
+        self.pillowExifTags = {
+            "EXIF_camera": 0x0110,
+            "EXIF_make": 0x010F,
+            "EXIF_Date": 0x0132,
+            "EXIF_CaptureDate": 0x9003,
+            "EXIF_shutter": 0x829A,
+            "EXIF_author": 0x013B,
+            "EXIF_aperture": 0x829D,
+            "EXIF_ISO": 0x8827,
+            "EXIF_focalLength": 0x920A,
+            "EXIF_orientation": 0x0112
+        }
+
+        # exiftool tag names for the same fields, read with -n so values are unformatted like Pillow's
+        self.exiftoolTags = {
+            "EXIF_camera": "Model",
+            "EXIF_make": "Make",
+            "EXIF_Date": "ModifyDate",
+            "EXIF_CaptureDate": "DateTimeOriginal",
+            "EXIF_shutter": "ExposureTime",
+            "EXIF_author": "Artist",
+            "EXIF_aperture": "FNumber",
+            "EXIF_ISO": "ISO",
+            "EXIF_focalLength": "FocalLength",
+            "EXIF_lens": "LensModel",
+            "EXIF_orientation": "Orientation"
         }
 
         self.ExifTags = {
@@ -120,6 +407,10 @@ class ContactSheetGenerator(object):
             "EXIF_fileResolutionWidth": True,
             "EXIF_fileResolutionHeight": True
         }
+        # Per-tag settings from the config; --no-exif hides every tag
+        self.ExifTagsShow.update(self.contactSheetConfiguration.get("ExifTagsShow", {}))
+        if not self.contactSheetConfiguration.get("showExif", True):
+            self.ExifTagsShow = dict.fromkeys(self.ExifTagsShow, False)
 
         self.fileList = []
         self.imageWidth = 0
@@ -135,6 +426,13 @@ class ContactSheetGenerator(object):
         self.isProcessingFolder = False  # Track if processing a folder
         self.htmlImages = []  # Store image info for HTML generation
         self.contactSheetImages = []  # Store processed images for contact sheet generation
+        self.saveExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=2)  # Background JPEG encoding
+        self.saveFutures = []  # Pending (fileName, future) saves
+        self.fontSize = self.contactSheetConfiguration["contactSheetWidth"] // 12  # Constant for the run
+        self.textFontSize = max(8, int(self.fontSize * 0.3))  # Text is rendered directly at its final size
+        self.fontPath = find_font_path()  # Resolved once per process instead of per text render
+        self.cachedExif = None  # Tags from an earlier run over the same unchanged file
+        self.decodedPreview = False  # Last decode was a RAW's embedded preview, not a demosaic
 
         if directory_in:
             self.getImagesFromDirectory(directory_in)
@@ -146,33 +444,49 @@ class ContactSheetGenerator(object):
         self.isProcessingFolder = len(self.fileList) > 1
         self.frameCounter = 0
 
-        for fileName in self.fileList:
-            t0 = time.time()
-            if self.isProcessingFolder or self.contactSheetConfiguration.get('renameFrames', False):
-                self.frameCounter += 1
-            print(f"Processing: {os.path.basename(fileName)}")
-
-            self.extractShootingInformation(fileName)
-            image = self.makeThumb(fileName)
-
-            # Store image for contact sheet generation if requested
-            if self.contactSheetConfiguration.get('generateContactSheet', False):
-                self.contactSheetImages.append({
-                    'image': image.copy(),
-                    'filename': os.path.basename(fileName),
-                    'filepath': fileName
-                })
-                # Skip saving individual images when generating contact sheet
-                print(f"Stored image for contact sheet: {os.path.basename(fileName)}")
-            else:
-                self.saveImage(image, fileName)
-
-            # Export 2000px version if requested
-            if self.contactSheetConfiguration.get('export2000px', False):
-                self.export2000pxVersion(fileName)
-
-            t1 = time.time()
-            print(f"{fileName} done in {t1-t0:.2f} seconds")
+        # Frame numbers are assigned from the sorted file order so they stay
+        # deterministic when files are processed in parallel
+        numberFrames = self.isProcessingFolder or self.contactSheetConfiguration.get('renameFrames', False)
+        frames = [i + 1 if numberFrames else 0 for i in range(len(self.fileList))]
+
+        # Fail before starting any workers if RAW files are queued and dcraw is missing,
+        # unless rawpy can serve their embedded previews in-process
+        rawQueued = any(f.lower().endswith(RAW_EXTENSIONS) for f in self.fileList)
+        if rawQueued and self.contactSheetConfiguration.get('strictToolCheck', False):
+            # Run the --strict dcraw check once here; workers inherit the result
+            # instead of each rerunning it and rewriting the tool cache
+            self.isToolAvailable('dcraw')
+        needsDcraw = rawpy is None or not self.contactSheetConfiguration["useEmbeddedJpg"]
+        if needsDcraw and rawQueued and not self.isToolAvailable('dcraw'):
+            raise RuntimeError("dcraw is required for RAW file processing. Install with: brew install dcraw")
+
+        # Reuse EXIF extracted on earlier runs for files that haven't changed
+        exifCacheDir = os.path.dirname(self.fileList[0]) if self.fileList else ""
+        exifCachePath = os.path.join(exifCacheDir, ".exif_cache.json") if self.fileList else ""
+        exifCache = self.loadExifCache(exifCachePath)
+        exifKeys = [self.exifCacheKey(f) for f in self.fileList]
+        cachedExif = [exifCache.get(key) for key in exifKeys]
+        # Keep entries for files outside this run; only drop ones whose file has changed or gone
+        newExifCache = {key: tags for key, tags in exifCache.items()
+                        if self.exifCacheEntryIsCurrent(exifCacheDir, key)}
+
+        worker = partial(process_one, config=self.contactSheetConfiguration,
+                         isProcessingFolder=self.isProcessingFolder, toolAvailable=dict(self.toolAvailable))
+        max_workers = max(1, min(os.cpu_count() or 1, len(self.fileList)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # map() yields results in input order, keeping HTML and contact sheet order stable
+            results = executor.map(worker, self.fileList, frames, cachedExif)
+            for key, (htmlImages, contactSheetImages, exifTags) in zip(exifKeys, results):
+                self.htmlImages.extend(htmlImages)
+                self.contactSheetImages.extend(contactSheetImages)
+                # Don't cache misses, so installing exiv2 or exiftool later still helps
+                if any(tag.startswith("EXIF_") for tag in exifTags):
+                    newExifCache[key] = exifTags
+
+        if newExifCache != exifCache:
+            self.saveExifCache(exifCachePath, newExifCache)
+
+        self.waitForSaves()
 
         # Generate HTML contact sheet if requested
         if self.contactSheetConfiguration.get('generateHTML', False):
@@ -188,32 +502,104 @@ class ContactSheetGenerator(object):
         else:
             print(f"PNG contact sheet generation disabled (generateContactSheet: {self.contactSheetConfiguration.get('generateContactSheet', 'not set')})")
 
-    def saveImage(self, image, filePath):
-        # Create date-gallery subfolder
+    def processFile(self, fileName):
+        t0 = time.time()
+        print(f"Processing: {os.path.basename(fileName)}")
+
+        # Decode in the background so dcraw overlaps with the exiv2 subprocess
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            decoded = executor.submit(self.decodeImage, fileName)
+            self.extractShootingInformation(fileName)
+            decodedImage = decoded.result()
+            if self.decodedPreview:
+                # Embedded previews don't get dcraw's orientation flip, so apply the RAW's own
+                decodedImage = self.orientPreview(decodedImage)
+            image = self.makeThumb(fileName, decodedImage)
+
+        # Store image for contact sheet generation if requested
+        if self.contactSheetConfiguration.get('generateContactSheet', False):
+            self.contactSheetImages.append({
+                'image': image,
+                'filename': os.path.basename(fileName),
+                'filepath': fileName
+            })
+            # Skip saving individual images when generating contact sheet
+            print(f"Stored image for contact sheet: {os.path.basename(fileName)}")
+        else:
+            self.saveImage(image, fileName)
+
+        # Export 2000px version if requested
+        if self.contactSheetConfiguration.get('export2000px', False):
+            self.export2000pxVersion(fileName, decodedImage)
+
+        self.waitForSaves()
+
+        t1 = time.time()
+        print(f"{fileName} done in {t1-t0:.2f} seconds")
+
+    def waitForSaves(self):
+        """Block until all queued JPEG saves have been written"""
+        for fileName, future in self.saveFutures:
+            future.result()
+            print(f"Saved: {fileName}")
+        self.saveFutures = []
+
+    def exifCacheKey(self, filePath):
+        """Identify a file by name, modification time and size"""
+        st = os.stat(filePath)
+        return f"{os.path.basename(filePath)}:{st.st_mtime_ns}:{st.st_size}"
+
+    def exifCacheEntryIsCurrent(self, directory, key):
+        """Whether a cache key still matches its file on disk"""
+        fileName = key.rsplit(":", 2)[0]
+        try:
+            return self.exifCacheKey(os.path.join(directory, fileName)) == key
+        except OSError:
+            return False
+
+    def loadExifCache(self, cachePath):
+        """Load EXIF saved by an earlier run, or an empty dict"""
+        try:
+            with open(cachePath) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def saveExifCache(self, cachePath, cache):
+        """Write the EXIF cache next to the source files; a read-only folder just goes uncached"""
+        try:
+            with open(cachePath, 'w') as f:
+                json.dump(cache, f)
+        except OSError:
+            pass
+
+    def galleryDir(self, filePath):
+        """Return the date-gallery subfolder for a file, creating it if needed"""
         dir_path = os.path.dirname(filePath)
 
         # Get date from EXIF for folder name
         folder_date = ""
         if hasattr(self, 'ExifTags') and 'EXIF_CaptureDate' in self.ExifTags and self.ExifTags['EXIF_CaptureDate']:
             try:
-                from datetime import datetime
                 date_str = self.ExifTags['EXIF_CaptureDate']
-                date_obj = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
+                date_obj = parse_exif_date(date_str)
                 folder_date = date_obj.strftime('%Y-%m-%d')
             except:
                 pass
 
         if not folder_date:
-            from datetime import datetime
             folder_date = datetime.now().strftime('%Y-%m-%d')
 
         # Create folder name: YYYY-MM-DD Gallery Name
         gallery_name = self.contactSheetConfiguration.get('galleryName', 'Contact Sheet')
         folder_name = f"{folder_date} {gallery_name}"
         gallery_dir = os.path.join(dir_path, folder_name)
-        if not os.path.exists(gallery_dir):
-            os.makedirs(gallery_dir)
-            print(f"Created directory: {gallery_dir}")
+        make_gallery_dir(gallery_dir)
+        return gallery_dir
+
+    def saveImage(self, image, filePath):
+        # Create date-gallery subfolder
+        gallery_dir = self.galleryDir(filePath)
 
         # Determine output filename
         base_name = os.path.basename(filePath)
@@ -226,8 +612,12 @@ class ContactSheetGenerator(object):
             fileName = os.path.join(gallery_dir, fileName + "_cs.jpg")
 
         quality_val = self.contactSheetConfiguration["JPG_Quality"]
-        image.save(fileName, 'JPEG', quality=quality_val)
-        print(f"Saved: {fileName}")
+        # Encode in the background (libjpeg releases the GIL); baseline Huffman
+        # tables are set explicitly to keep the encode single-pass, and 4:2:0
+        # chroma is invisible at contact sheet size
+        future = self.saveExecutor.submit(image.save, fileName, 'JPEG', quality=quality_val,
+                                          subsampling=2, optimize=False, progressive=False)
+        self.saveFutures.append((fileName, future))
 
         # Store image info for HTML generation
         if self.contactSheetConfiguration.get('generateHTML', False):
@@ -251,22 +641,15 @@ class ContactSheetGenerator(object):
 
         print(f"Creating contact sheet with {len(self.contactSheetImages)} images")
 
-        # Calculate grid dimensions
+        # Calculate grid dimensions: a full square when the count allows it, otherwise
+        # a landscape-leaning grid that always fits every image
         num_images = len(self.contactSheetImages)
-        if num_images == 1:
-            cols, rows = 1, 1
-        elif num_images <= 4:
-            cols, rows = 2, 2
-        elif num_images <= 9:
-            cols, rows = 3, 3
-        elif num_images <= 16:
-            cols, rows = 4, 4
-        elif num_images <= 25:
-            cols, rows = 5, 5
+        side = int(math.sqrt(num_images))
+        if side * side == num_images:
+            cols, rows = side, side
         else:
-            # For larger numbers, use a rectangular grid
-            cols = int(math.ceil(math.sqrt(num_images * 1.5)))
-            rows = int(math.ceil(num_images / cols))
+            cols = min(num_images, math.ceil(math.sqrt(num_images * 1.5)))
+            rows = math.ceil(num_images / cols)
 
         # Get dimensions of first image to calculate contact sheet size
         first_image = self.contactSheetImages[0]['image']
@@ -282,9 +665,6 @@ class ContactSheetGenerator(object):
 
         # Paste images into contact sheet
         for i, img_data in enumerate(self.contactSheetImages):
-            if i >= cols * rows:  # Don't exceed grid capacity
-                break
-
             row = i // cols
             col = i % cols
 
@@ -299,175 +679,57 @@ class ContactSheetGenerator(object):
         # Save contact sheet in input folder
         dir_path = os.path.dirname(self.contactSheetImages[0]['filepath'])
 
-        # Save as PNG directly in input folder
-        contact_sheet_path = os.path.join(dir_path, "contact-sheet.png")
-        contact_sheet.save(contact_sheet_path, 'PNG')
+        # Save directly in input folder; a proof sheet favors encode speed over file size
+        if self.contactSheetConfiguration["contactSheetFormat"] == "jpeg":
+            contact_sheet_path = os.path.join(dir_path, "contact-sheet.jpg")
+            contact_sheet.save(contact_sheet_path, 'JPEG', quality=90, progressive=True)
+        else:
+            contact_sheet_path = os.path.join(dir_path, "contact-sheet.png")
+            contact_sheet.save(contact_sheet_path, 'PNG', compress_level=1, optimize=False)
         print(f"Contact sheet saved: {contact_sheet_path}")
-        print(f"Contact sheet dimensions: {contact_width}x{contact_height} pixels")
-        print(f"Grid layout: {cols}x{rows} images")
-
-
-
-    def generateHTMLContactSheet(self):
-        """Generate an HTML contact sheet with all processed images and lightbox functionality"""
-        print(f"Starting HTML generation with {len(self.htmlImages)} images")
-
-        # Create date-gallery folder if it doesn't exist
-        if self.fileList:
-            dir_path = os.path.dirname(self.fileList[0])
-
-            # Determine the date for folder name from EXIF capture date
-            dates = []
-            for img_info in self.htmlImages:
-                # Try to extract date from EXIF capture date
-                if 'EXIF_CaptureDate' in img_info['exif'] and img_info['exif']['EXIF_CaptureDate']:
-                    try:
-                        from datetime import datetime
-                        date_str = img_info['exif']['EXIF_CaptureDate']
-                        # EXIF date format: YYYY:MM:DD HH:MM:SS
-                        date_obj = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
-                        dates.append(date_obj)
-                    except:
-                        pass
-
-            # Use the first date found, or fallback to today
-            if dates:
-                dates.sort()
-                folder_date = dates[0].strftime('%Y-%m-%d')
-            else:
-                from datetime import datetime
-                folder_date = datetime.now().strftime('%Y-%m-%d')
-
-            # Create folder name: YYYY-MM-DD Gallery Name
-            gallery_name = self.contactSheetConfiguration.get('galleryName', 'Contact Sheet')
-            folder_name = f"{folder_date} {gallery_name}"
-            gallery_dir = os.path.join(dir_path, folder_name)
-            if not os.path.exists(gallery_dir):
-                os.makedirs(gallery_dir)
-
-            # Generate HTML content
-            gallery_name = self.contactSheetConfiguration.get('galleryName', 'Contact Sheet')
-            html_content = """<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>""" + gallery_name + """</title>
-    <style>
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-color: #000000;
-            color: #ffffff;
-            margin: 0;
-            padding: 20px;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-        }
-        h1 {
-            text-align: center;
-            color: #ffffff;
-            margin-bottom: 30px;
-        }
-        .grid {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 10px;
-            justify-content: center;
-        }
-        .image-container {
-            cursor: pointer;
-            border: 2px solid transparent;
-            transition: border-color 0.2s;
-        }
-        .image-container:hover {
-            border-color: #666666;
-        }
-        .image-container img {
-            display: block;
-            max-width: 100%;
-            height: auto;
-        }
-        .date-range {
-            text-align: center;
-            color: #888;
-            margin-bottom: 30px;
-            font-size: 1.1em;
-        }
-        .timestamp {
-            text-align: center;
-            color: #666;
-            margin-top: 30px;
-            font-size: 0.9em;
-        }
-
-        /* Lightbox styles */
-        .lightbox {
-            display: none;
-            position: fixed;
-            z-index: 1000;
-            left: 0;
-            top: 0;
-            width: 100%;
-            height: 100%;
-            background-color: rgba(0, 0, 0, 0.9);
-            cursor: pointer;
-        }
-        .lightbox-content {
-            position: absolute;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%);
-            max-width: 90%;
-            max-height: 90%;
-            object-fit: contain;
-        }
-        .lightbox-close {
-            position: absolute;
-            top: 20px;
-            right: 35px;
-            color: #fff;
-            font-size: 40px;
-            font-weight: bold;
-            cursor: pointer;
-            z-index: 1001;
-        }
-        .lightbox-close:hover {
-            color: #ff9c00;
-        }
-        .lightbox-nav {
-            position: absolute;
-            top: 50%;
-            transform: translateY(-50%);
-            color: #fff;
-            font-size: 30px;
-            font-weight: bold;
-            cursor: pointer;
-            background-color: rgba(0, 0, 0, 0.5);
-            padding: 10px 15px;
-            border-radius: 5px;
-            user-select: none;
-        }
-        .lightbox-nav:hover {
-            color: #ff9c00;
-            background-color: rgba(0, 0, 0, 0.8);
-        }
-        .lightbox-prev {
-            left: 20px;
-        }
-        .lightbox-next {
-            right: 20px;
-        }
+        print(f"Contact sheet dimensions: {contact_width}x{contact_height} pixels")
+        print(f"Grid layout: {cols}x{rows} images")
 
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>""" + gallery_name + """</h1>
-        <div class="date-range" id="date-range"></div>
-        <div class="grid">
-"""
+
+
+    def generateHTMLContactSheet(self):
+        """Generate an HTML contact sheet with all processed images and lightbox functionality"""
+        print(f"Starting HTML generation with {len(self.htmlImages)} images")
+
+        # Create date-gallery folder if it doesn't exist
+        if self.fileList:
+            dir_path = os.path.dirname(self.fileList[0])
+
+            # Determine the date for folder name from EXIF capture date
+            dates = []
+            for img_info in self.htmlImages:
+                # Try to extract date from EXIF capture date
+                if 'EXIF_CaptureDate' in img_info['exif'] and img_info['exif']['EXIF_CaptureDate']:
+                    try:
+                        from datetime import datetime
+                        date_str = img_info['exif']['EXIF_CaptureDate']
+                        # EXIF date format: YYYY:MM:DD HH:MM:SS
+                        date_obj = parse_exif_date(date_str)
+                        dates.append(date_obj)
+                    except:
+                        pass
+
+            # Use the first date found, or fallback to today
+            if dates:
+                dates.sort()
+                folder_date = dates[0].strftime('%Y-%m-%d')
+            else:
+                from datetime import datetime
+                folder_date = datetime.now().strftime('%Y-%m-%d')
+
+            # Create folder name: YYYY-MM-DD Gallery Name
+            gallery_name = self.contactSheetConfiguration.get('galleryName', 'Contact Sheet')
+            folder_name = f"{folder_date} {gallery_name}"
+            gallery_dir = os.path.join(dir_path, folder_name)
+            make_gallery_dir(gallery_dir)
+
+            # Generate HTML content, collecting the page in pieces and joining once at the end
+            parts = [HTML_HEAD.substitute(gallery_name=gallery_name)]
 
             # Determine date range for display (reuse dates extracted above)
             date_range_str = ""
@@ -499,104 +761,31 @@ class ContactSheetGenerator(object):
                 # Determine the large image path (without _cs suffix)
                 large_img_path = img_path.replace('_cs.jpg', '.jpg')
 
-                html_content += f"""
+                parts.append(f"""
             <div class="image-container" onclick="openLightbox({i})">
                 <img src="{img_path}" alt="Image {i+1}" loading="lazy">
             </div>
-"""
+""")
 
             # Add lightbox HTML and JavaScript
             from datetime import datetime
             timestamp = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-            html_content += f"""
-        </div>
-        <div class="timestamp">Generated on {timestamp}</div>
-    </div>
-
-    <!-- Lightbox -->
-    <div id="lightbox" class="lightbox" onclick="closeLightbox()">
-        <span class="lightbox-close" onclick="closeLightbox()">&times;</span>
-        <div class="lightbox-nav lightbox-prev" onclick="event.stopPropagation(); previousImage()">&#10094;</div>
-        <div class="lightbox-nav lightbox-next" onclick="event.stopPropagation(); nextImage()">&#10095;</div>
-        <img class="lightbox-content" id="lightbox-image" onclick="event.stopPropagation();">
-
-    </div>
-
-    <script>
-        // Image data for lightbox
-        const images = ["""
+            parts.append(HTML_LIGHTBOX.substitute(timestamp=timestamp))
 
             # Add image data for JavaScript
-            for i, img_info in enumerate(self.htmlImages):
+            imageData = []
+            for img_info in self.htmlImages:
                 large_img_path = img_info['path'].replace('_cs.jpg', '.jpg')
                 large_img_path = os.path.basename(large_img_path)
 
-                if i > 0:
-                    html_content += ","
-                html_content += f"""
+                imageData.append(f"""
             {{
                 src: "{large_img_path}"
-            }}"""
-
-            html_content += """
-        ];
+            }}""")
+            parts.append(",".join(imageData))
 
-        let currentImageIndex = 0;
-
-        function openLightbox(index) {
-            currentImageIndex = index;
-            const lightbox = document.getElementById('lightbox');
-            const lightboxImage = document.getElementById('lightbox-image');
-
-            lightboxImage.src = images[index].src;
-
-            lightbox.style.display = 'block';
-            document.body.style.overflow = 'hidden';
-        }
-
-        function closeLightbox() {
-            document.getElementById('lightbox').style.display = 'none';
-            document.body.style.overflow = 'auto';
-        }
-
-        function nextImage() {
-            currentImageIndex = (currentImageIndex + 1) % images.length;
-            openLightbox(currentImageIndex);
-        }
-
-        function previousImage() {
-            currentImageIndex = (currentImageIndex - 1 + images.length) % images.length;
-            openLightbox(currentImageIndex);
-        }
-
-        // Keyboard navigation
-        document.addEventListener('keydown', function(event) {
-            const lightbox = document.getElementById('lightbox');
-            if (lightbox.style.display === 'block') {
-                switch(event.key) {
-                    case 'Escape':
-                        closeLightbox();
-                        break;
-                    case 'ArrowRight':
-                        nextImage();
-                        break;
-                    case 'ArrowLeft':
-                        previousImage();
-                        break;
-                }
-            }
-        });
-
-        // Set date range
-        const dateRangeElement = document.getElementById('date-range');
-        const dateRange = '""" + date_range_str + """';
-        if (dateRange) {
-            dateRangeElement.textContent = dateRange;
-        }
-    </script>
-</body>
-</html>
-"""
+            parts.append(HTML_TAIL.substitute(date_range=date_range_str))
+            html_content = "".join(parts)
 
             # Write HTML file
             html_path = os.path.join(gallery_dir, "index.html")
@@ -616,24 +805,18 @@ class ContactSheetGenerator(object):
             self.fileList.append(path)
             return
 
-        fileList = os.listdir(path)
-        fileList = [f.lower() for f in fileList]
+        exts = frozenset(extensionTypes)
 
         print("Files found - will overwrite previously generated contactSheets:")
-        for fileName in fileList:
-            for ext_type in extensionTypes:
-                if fileName.endswith(ext_type):
-                    if not os.path.splitext(fileName)[0].endswith("_cs"):
-                        fileName = os.path.join(path, fileName)
-                        # Find original case filename
-                        orig_files = os.listdir(path)
-                        for orig_file in orig_files:
-                            if orig_file.lower() == os.path.basename(fileName).lower():
-                                fileName = os.path.join(path, orig_file)
-                                break
-                        self.fileList.append(fileName)
-                    else:
-                        pass
+        # Match case-insensitively but keep the original-case name from a single listing;
+        # scandir's entry types skip directories (like the gallery folders) without a stat
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                stem, ext = os.path.splitext(entry.name)
+                if ext.lower() in exts and not stem.lower().endswith("_cs"):
+                    self.fileList.append(entry.path)
 
         # Sort files alphabetically for consistent frame numbering
         self.fileList.sort()
@@ -642,15 +825,16 @@ class ContactSheetGenerator(object):
         for f in self.fileList:
             print(f"  {f}")
 
-    def imageCanvasExpand(self, image, percent):
+    def canvasLayout(self, width, height, percent):
+        """Return the (possibly scaled) image size and margins of the expanded canvas"""
         # Calculate base margin from the larger dimension
-        if image.size[0] > image.size[1]:
-            baseMargin = (image.size[0] // 100) * percent
+        if width > height:
+            baseMargin = (width // 100) * percent
         else:
-            baseMargin = (image.size[1] // 100) * percent
+            baseMargin = (height // 100) * percent
 
         # Calculate minimum space needed for text
-        fontsize = self.contactSheetConfiguration["contactSheetWidth"] // 12
+        fontsize = self.fontSize
         fontScale = 0.3
         text_height = int(fontsize * fontScale * 1.4)  # 1.4x for padding (reduced from 1.5x)
         min_text_space = text_height + 15  # Text height + comfortable padding (reduced from 20)
@@ -669,24 +853,34 @@ class ContactSheetGenerator(object):
             needed_top = max(0, min_text_space - topMargin)
             needed_bottom = max(0, min_text_space - bottomMargin)
             needed_reduction = max(needed_top, needed_bottom)
-            scale_factor = 1.0 - (needed_reduction / image.size[1])
+            scale_factor = 1.0 - (needed_reduction / height)
             scale_factor = max(scale_factor, 0.9)  # Don't scale below 90%
 
             # Scale the image
-            scaled_width = int(image.size[0] * scale_factor)
-            scaled_height = int(image.size[1] * scale_factor)
-            image = image.resize((scaled_width, scaled_height), Image.Resampling.LANCZOS)
+            width = int(width * scale_factor)
+            height = int(height * scale_factor)
 
             # Recalculate margins based on scaled image to maintain proportions
-            if image.size[0] > image.size[1]:
-                baseMargin = (image.size[0] // 100) * percent
+            if width > height:
+                baseMargin = (width // 100) * percent
             else:
-                baseMargin = (image.size[1] // 100) * percent
+                baseMargin = (height // 100) * percent
 
             topMargin = max(baseMargin // 2, min_text_space)
             sideMargin = baseMargin // 2
             bottomMargin = max(baseMargin // 2, min_text_space)
 
+        return width, height, sideMargin, topMargin, bottomMargin
+
+    def imageCanvasExpand(self, image, percent, layout=None):
+        if layout is None:
+            layout = self.canvasLayout(image.size[0], image.size[1], percent)
+        width, height, sideMargin, topMargin, bottomMargin = layout
+
+        # makeThumb resizes straight to the scaled size; only resample here when it didn't
+        if image.size != (width, height):
+            image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
         # Store the actual crop dimensions for text positioning
         self.actualCropWidth = sideMargin
         self.actualCropHeight = topMargin
@@ -703,21 +897,126 @@ class ContactSheetGenerator(object):
         return expanded
 
     def imageSharpen(self, image, amount):
-        return image.filter(ImageFilter.SHARPEN)
+        if amount <= 0:
+            return image
+
+        # Split strong sharpening over two passes to limit halos
+        passes = 2 if amount >= 2 else 1
+        sharpen_filter = ImageFilter.UnsharpMask(radius=0.5, percent=int(50 * amount / passes), threshold=2)
+        for _ in range(passes):
+            image = image.filter(sharpen_filter)
+        return image
+
+    def formatExifValue(self, key, value):
+        """Format a raw in-process EXIF value the way exiv2 prints it"""
+        if isinstance(value, tuple):
+            value = value[0]
+
+        try:
+            if key == "EXIF_shutter":
+                seconds = float(Fraction(str(value)))
+                if 0 < seconds < 1:
+                    return f"1/{round(1 / seconds)} s"
+                return f"{seconds:g} s"
+            if key == "EXIF_aperture":
+                return f"F{round(float(Fraction(str(value))), 1):g}"
+            if key == "EXIF_focalLength":
+                return f"{float(Fraction(str(value))):.1f} mm"
+        except (ValueError, ZeroDivisionError):
+            pass
+
+        return str(value).strip("\x00 ")
+
+    def readExifInProcess(self, imagePath):
+        """Read EXIF tags without spawning exiv2; returns False if nothing was found"""
+        tags = {}
+        try:
+            with Image.open(imagePath) as img:
+                exif = img.getexif()
+                tags.update(exif)
+                tags.update(exif.get_ifd(0x8769))  # Exif sub-IFD
+        except Exception:
+            pass
+
+        found = {key: tags[tagId] for key, tagId in self.pillowExifTags.items() if tagId in tags}
+
+        # Pillow can't open most RAW containers; pyexiv2 binds the exiv2 library directly
+        if not found and pyexiv2 is not None:
+            try:
+                img = pyexiv2.Image(imagePath)
+                rawExif = img.read_exif()
+                img.close()
+                found = {key: rawExif[tag] for key, tag in self.catchCanonExifTags.items() if tag in rawExif}
+            except Exception:
+                pass
+
+        for key, value in found.items():
+            self.ExifTags[key] = self.formatExifValue(key, value)
+
+        return bool(found)
+
+    def readExifWithExiftool(self, imagePath):
+        """Read EXIF tags through this process's long-running exiftool; returns False if nothing was found"""
+        exiftool = exiftool_process()
+        if exiftool is None:
+            return False
+
+        tagToKey = {tag: key for key, tag in self.exiftoolTags.items()}
+        found = {}
+        try:
+            args = [f"-{tag}" for tag in self.exiftoolTags.values()] + [imagePath, "-execute"]
+            exiftool.stdin.write("\n".join(args) + "\n")
+            exiftool.stdin.flush()
+            # Output is "Tag: value" lines, terminated by exiftool's {ready} marker
+            for line in iter(exiftool.stdout.readline, ""):
+                if line.startswith("{ready"):
+                    break
+                tag, _, value = line.partition(": ")
+                if tag in tagToKey:
+                    found[tagToKey[tag]] = value.rstrip("\n")
+        except (OSError, ValueError):
+            return False
+
+        for key, value in found.items():
+            self.ExifTags[key] = self.formatExifValue(key, value)
+
+        return bool(found)
 
     def extractShootingInformation(self, imagePath):
+        if self.cachedExif is not None:
+            self.ExifTags.update(self.cachedExif)
+            return
+
+        if self.readExifInProcess(imagePath):
+            return
+
+        # With EXIF display off, don't spawn exiv2 (or even look for it) just for the capture date
+        if not self.contactSheetConfiguration.get("showExif", True):
+            return
+
+        if self.readExifWithExiftool(imagePath):
+            return
+
+        if not self.isToolAvailable('exiv2'):
+            print(f"Warning: Could not extract EXIF data from {imagePath}")
+            return
+
         # Use exiv2 instead of exiv2.exe for macOS
         exiv2_opts = ["exiv2", "-p", "a", imagePath]
         try:
             result = subprocess.run(exiv2_opts, capture_output=True, text=True, timeout=30)
+            # exiv2 exits non-zero when some metadata is missing, so only give up if nothing was printed
+            if result.returncode != 0 and not result.stdout:
+                print(f"Warning: Could not extract EXIF data from {imagePath}")
+                return
             rawExif = result.stdout
             rawExifLines = rawExif.split("\n")
 
             for line in rawExifLines:
-                for key in self.catchCanonExifTags.keys():
-                    if self.catchCanonExifTags[key] in line:
-                        self.ExifTags[key] = line.split("  ")[-1].rstrip()
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, FileNotFoundError):
+                match = self.exifLineRegex.match(line)
+                if match:
+                    self.ExifTags[self.exifTagToKey[match.group(1)]] = match.group(2).rstrip()
+        except (subprocess.TimeoutExpired, FileNotFoundError):
             print(f"Warning: Could not extract EXIF data from {imagePath}")
 
     def imageGenerateSpreadText(self, image, text_string, image_width, position="top", align="left"):
@@ -725,31 +1024,8 @@ class ContactSheetGenerator(object):
             return image
 
         fontColor = self.contactSheetConfiguration["fontColor"]
-        fontsize = self.contactSheetConfiguration["contactSheetWidth"] // 12
-        fontScale = 0.3
-
-        # Try to find Iosvmata font or fallback to system fonts
-        font_paths = [
-            "/System/Library/Fonts/Iosvmata.ttf",
-            "/Library/Fonts/Iosvmata.ttf",
-            "/usr/local/share/fonts/Iosvmata.ttf",
-            "/opt/homebrew/share/fonts/Iosvmata.ttf",
-            "/System/Library/Fonts/Menlo.ttc",
-            "/System/Library/Fonts/Monaco.ttf",
-            "/System/Library/Fonts/Arial.ttf"
-        ]
-
-        font = None
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    font = ImageFont.truetype(font_path, fontsize)
-                    break
-                except OSError:
-                    continue
-
-        if not font:
-            font = ImageFont.load_default()
+        fontsize = self.textFontSize
+        font = load_font(self.fontPath, fontsize)
 
         # Use the stored actual crop dimensions from canvas expansion
         cropWidth = self.actualCropWidth
@@ -760,29 +1036,18 @@ class ContactSheetGenerator(object):
         # Align text with the left edge of the image frame
         image_left_edge = cropWidth
 
-        # Create text image for the entire string
-        try:
-            bbox = font.getbbox(text_string)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-        except:
-            # Fallback for older PIL versions
-            text_width, text_height = font.getsize(text_string)
-
-        # Add padding to prevent clipping
-        padding = fontsize // 2
-        textImage = Image.new('RGBA', (text_width + padding * 2, text_height + padding * 2), (0, 0, 0, 0))
-        textImageDraw = ImageDraw.Draw(textImage)
-        textImageDraw.text((padding, padding), text_string, font=font, fill=fontColor)
-
-        textImage = textImage.resize((int(textImage.size[0] * fontScale),
-                                     int(textImage.size[1] * fontScale)),
-                                    Image.Resampling.LANCZOS)
+        # Measure the entire string; labels like the camera line repeat across frames
+        text_width, text_height = measure_text(self.fontPath, fontsize, text_string)
+
+        # Lay the text out in a padded box, as if it were rendered to its own image
+        textPadding = fontsize // 2
+        boxWidth = text_width + textPadding * 2
+        boxHeight = text_height + textPadding * 2
 
         # Calculate vertical offset based on position
         if position == "top":
             padding = 6  # Padding between text bottom and image top
-            vertOffset = cropHeight - textImage.size[1] - padding + 1  # Move down by 2px
+            vertOffset = cropHeight - boxHeight - padding + 1  # Move down by 2px
 
             # Make sure text doesn't go above the top edge
             if vertOffset < 2:
@@ -798,79 +1063,66 @@ class ContactSheetGenerator(object):
         # Positioning based on alignment
         if align == "right":
             # Right-aligned positioning - align to right edge of image frame
-            horOffset = image_left_edge + image_width - textImage.size[0] - 22
+            horOffset = image_left_edge + image_width - boxWidth - 22
         else:
             # Left-aligned positioning with slight offset
             horOffset = image_left_edge - 7
 
-        image.paste(textImage, (int(horOffset), int(vertOffset)), textImage)
+        # Draw straight onto the frame instead of pasting a separate text image
+        ImageDraw.Draw(image).text((int(horOffset) + textPadding, int(vertOffset) + textPadding),
+                                   text_string, font=font, fill=fontColor)
 
         return image
 
-    def export2000pxVersion(self, filePath):
+    def export2000pxVersion(self, filePath, decodedImage=None):
         """Export a 2000px wide version of the original image"""
         try:
-            # Open the original file
-            if filePath.lower().endswith((".jpg", ".jpeg")):
+            # Reuse the image decoded for the thumbnail unless it is too small, or an embedded
+            # RAW preview, which is the camera's JPEG without dcraw's orientation flip
+            if decodedImage is not None and decodedImage.size[0] >= 2000 and not self.decodedPreview:
+                image = decodedImage
+            elif filePath.lower().endswith((".jpg", ".jpeg")):
                 image = Image.open(filePath)
+                # Decode at a reduced DCT scale, keeping 2x headroom over the export width
+                if image.size[0] > 4000:
+                    image.draft('RGB', (4000, 4000))
             elif filePath.lower().endswith((".tif", ".tiff")):
                 # Try to open TIFF directly first
                 try:
                     image = Image.open(filePath)
                 except:
                     # Fall back to dcraw for TIFF if needed
-                    dcraw_opts = ["dcraw", "-c", "-4", "-T", filePath]
-                    result = subprocess.run(dcraw_opts, capture_output=True, timeout=60)
-                    if result.returncode == 0:
-                        rawImage = BytesIO(result.stdout)
-                        image = Image.open(rawImage)
-                    else:
+                    image = self.runDcraw(["dcraw", "-c", "-4", "-T", filePath])
+                    if image is None:
                         raise Exception("Failed to process TIFF")
             else:
-                # RAW file - use dcraw
-                dcraw_opts = ["dcraw", "-c", filePath]
-                result = subprocess.run(dcraw_opts, capture_output=True, timeout=60)
-                if result.returncode == 0:
-                    rawImage = BytesIO(result.stdout)
-                    image = Image.open(rawImage)
-                else:
+                # RAW file - use dcraw, decoding its PPM as it streams in
+                image = self.runDcraw(["dcraw", "-c", filePath])
+                if image is None:
                     raise Exception("Failed to process RAW file")
 
+            # Flatten to RGB up front so resize and sharpen never carry an alpha channel
+            if image.mode == 'RGBA':
+                # Create a white background and paste the image on it
+                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+                rgb_image.paste(image, mask=image.split()[-1])  # Use alpha channel as mask
+                image = rgb_image
+            elif image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
             # Calculate new size (max 2000px wide)
             if image.size[0] > 2000:
                 ratio = 2000.0 / image.size[0]
                 new_height = int(image.size[1] * ratio)
-                image = image.resize((2000, new_height), Image.Resampling.LANCZOS)
+                # Box-reduce large decodes first so LANCZOS only runs over the last 2x
+                image = image.resize((2000, new_height), Image.Resampling.LANCZOS, reducing_gap=2.0)
 
             # Apply sharpening after resize
             # Use less aggressive sharpening than contact sheets since these are larger
             sharpen_filter = ImageFilter.UnsharpMask(radius=1, percent=100, threshold=3)
             image = image.filter(sharpen_filter)
 
-            # Create gallery subfolder
-            dir_path = os.path.dirname(filePath)
-
-            # Get date from EXIF for folder name
-            folder_date = ""
-            if hasattr(self, 'ExifTags') and 'EXIF_CaptureDate' in self.ExifTags and self.ExifTags['EXIF_CaptureDate']:
-                try:
-                    from datetime import datetime
-                    date_str = self.ExifTags['EXIF_CaptureDate']
-                    date_obj = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S')
-                    folder_date = date_obj.strftime('%Y-%m-%d')
-                except:
-                    pass
-
-            if not folder_date:
-                from datetime import datetime
-                folder_date = datetime.now().strftime('%Y-%m-%d')
-
-            # Create folder name: YYYY-MM-DD Gallery Name
-            gallery_name = self.contactSheetConfiguration.get('galleryName', 'Contact Sheet')
-            folder_name = f"{folder_date} {gallery_name}"
-            gallery_dir = os.path.join(dir_path, folder_name)
-            if not os.path.exists(gallery_dir):
-                os.makedirs(gallery_dir)
+            gallery_dir = self.galleryDir(filePath)
 
             # Determine output filename
             base_name = os.path.basename(filePath)
@@ -882,15 +1134,9 @@ class ContactSheetGenerator(object):
                 name_only, ext = os.path.splitext(base_name)
                 output_name = os.path.join(gallery_dir, f"{name_only}.jpg")
 
-            # Convert RGBA to RGB if necessary for JPEG
-            if image.mode == 'RGBA':
-                # Create a white background and paste the image on it
-                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                rgb_image.paste(image, mask=image.split()[-1])  # Use alpha channel as mask
-                image = rgb_image
-
-            # Save with high quality
-            image.save(output_name, 'JPEG', quality=95)
+            # Save with high quality; single-pass baseline Huffman encode with 4:2:0 chroma
+            image.save(output_name, 'JPEG', quality=self.contactSheetConfiguration["exportJPG_Quality"],
+                       subsampling=2, optimize=False, progressive=False)
             print(f"Exported 2000px version: {output_name}")
 
         except Exception as e:
@@ -914,22 +1160,7 @@ class ContactSheetGenerator(object):
 
             if date_str:
                 # Format date nicely (YYYY:MM:DD HH:MM:SS -> May 6th, 2025)
-                try:
-                    # Parse the EXIF date format
-                    dt = datetime.strptime(date_str, "%Y:%m:%d %H:%M:%S")
-
-                    # Get ordinal suffix for day
-                    day = dt.day
-                    if 11 <= day <= 13:
-                        suffix = 'th'
-                    else:
-                        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
-
-                    # Format as "May 6th, 2025"
-                    top_text = dt.strftime(f"%B {day}{suffix}, %Y")
-                except:
-                    # Fallback to original date string if parsing fails
-                    top_text = date_str
+                top_text = format_exif_date(date_str)
             else:
                 # Fallback to filename if no date available
                 top_text = os.path.basename(fileName)
@@ -949,20 +1180,7 @@ class ContactSheetGenerator(object):
                     date_str = self.ExifTags["EXIF_Date"]
 
                 if date_str:
-                    try:
-                        # Parse the EXIF date format
-                        dt = datetime.strptime(date_str, "%Y:%m:%d %H:%M:%S")
-                        # Get ordinal suffix for day
-                        day = dt.day
-                        if 11 <= day <= 13:
-                            suffix = 'th'
-                        else:
-                            suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
-                        # Format as "May 6th, 2025"
-                        date_text = dt.strftime(f"%B {day}{suffix}, %Y")
-                    except:
-                        # Fallback to original date string if parsing fails
-                        date_text = date_str
+                    date_text = format_exif_date(date_str)
 
                     width_to_use = original_width if original_width is not None else self.imageWidth
                     image = self.imageGenerateSpreadText(image, date_text, width_to_use, position="top", align="right")
@@ -973,38 +1191,8 @@ class ContactSheetGenerator(object):
                 image = self.imageGenerateSpreadText(image, frame_text, width_to_use, position="top", align="right")
 
         # Create EXIF info for bottom: Camera, ISO, shutter, aperture
-        bottom_line_parts = []
-
-        # Camera
-        if self.ExifTagsShow.get("EXIF_camera", False) and "EXIF_camera" in self.ExifTags:
-            bottom_line_parts.append(self.ExifTags["EXIF_camera"])
-
-        # ISO
-        if self.ExifTagsShow.get("EXIF_ISO", False) and "EXIF_ISO" in self.ExifTags:
-            iso_text = self.ExifTags["EXIF_ISO"]
-            if not iso_text.startswith("ISO"):
-                iso_text = f"ISO {iso_text}"
-            bottom_line_parts.append(iso_text)
-
-        # Shutter speed
-        if self.ExifTagsShow.get("EXIF_shutter", False) and "EXIF_shutter" in self.ExifTags:
-            shutter_text = self.ExifTags["EXIF_shutter"]
-            if "/" in shutter_text and not shutter_text.endswith("s"):
-                shutter_text = f"{shutter_text}s"
-            bottom_line_parts.append(shutter_text)
-
-        # Aperture
-        if self.ExifTagsShow.get("EXIF_aperture", False) and "EXIF_aperture" in self.ExifTags:
-            aperture_text = self.ExifTags["EXIF_aperture"]
-            # Remove f/ prefix if it exists, then add f/
-            if aperture_text.startswith("f/F"):
-                aperture_text = aperture_text[3:]  # Remove "f/F"
-            elif aperture_text.startswith("f/"):
-                aperture_text = aperture_text[2:]  # Remove "f/"
-            elif aperture_text.startswith("F"):
-                aperture_text = aperture_text[1:]  # Remove "F"
-            aperture_text = f"f/{aperture_text}"
-            bottom_line_parts.append(aperture_text)
+        bottom_line_parts = [format_value(self.ExifTags[key]) for key, format_value in EXIF_BOTTOM_LINE
+                             if self.ExifTagsShow.get(key, False) and key in self.ExifTags]
 
         # Create single text string with spacing for bottom line
         if bottom_line_parts:
@@ -1017,96 +1205,188 @@ class ContactSheetGenerator(object):
         return image
 
     def imageHistogram(self, image):
-        histogramImage = Image.new('RGBA', (255, 100), (0, 0, 0, 0))
-        hist = image.histogram()
-
-        histogramImageR = hist[0:256]
-        histogramImageG = hist[256:512]
-        histogramImageB = hist[512:768]
-
-        histogramImageMax = [max(histogramImageR), max(histogramImageG), max(histogramImageB)]
-        histogramImageMaxL = max(histogramImageMax)
-
+        # NumPy is only needed here; importing it lazily keeps it off runs without --histogram
+        import numpy as np
+        hist = np.asarray(image.histogram(), dtype=np.float32).reshape(-1, 256)[:3, :255]
+
+        # Drawn directly at its final size with the overlay alpha baked in
+        width = self.contactSheetConfiguration["histogramWidth"]
+        height = self.contactSheetConfiguration["histogramHeight"]
+        alpha = self.contactSheetConfiguration["histogramAlpha"]
+        histogramArray = np.zeros((height, width, 4), dtype=np.uint8)
+        histogramArray[..., 3] = alpha
+
+        histogramImageMaxL = hist.max()
         if histogramImageMaxL == 0:
-            return histogramImage
+            return Image.fromarray(histogramArray)
 
-        histogramImageDraw = ImageDraw.Draw(histogramImage)
+        # Bar height per channel and output column, drawn as boolean column masks
+        bins = np.arange(width) * 255 // width
+        heights = (hist[:, bins] / histogramImageMaxL * height).astype(np.int32)
+        rows = np.arange(height)[:, None]
 
-        for i in range(min(255, len(histogramImageR))):
-            r_height = int((histogramImageR[i] / histogramImageMaxL) * 100)
-            g_height = int((histogramImageG[i] / histogramImageMaxL) * 100)
-            b_height = int((histogramImageB[i] / histogramImageMaxL) * 100)
+        for channel, color in enumerate(((255, 0, 0, alpha), (0, 255, 0, alpha), (0, 0, 255, alpha))):
+            histogramArray[rows <= heights[channel][None, :]] = color
 
-            histogramImageDraw.line([(i, 0), (i, r_height)], fill="#FF0000")
-            histogramImageDraw.line([(i, 0), (i, g_height)], fill="#00FF00")
-            histogramImageDraw.line([(i, 0), (i, b_height)], fill="#0000FF")
-
-        histogramImage = histogramImage.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-        return histogramImage
+        # Bars grow upward from the bottom edge
+        return Image.fromarray(histogramArray[::-1])
 
     def pasteHistogram(self, image, imageHistogram):
-        imageHistogram.putalpha(self.contactSheetConfiguration["histogramAlpha"])
-
-        imageHistogramWidth = self.contactSheetConfiguration["histogramWidth"]
-        imageHistogramHeight = self.contactSheetConfiguration["histogramHeight"]
-        imageHistogram = imageHistogram.resize((imageHistogramWidth, imageHistogramHeight))
-
         paste_x = (image.size[0] - imageHistogram.size[0]) - self.actualCropWidth
         paste_y = (image.size[1] - imageHistogram.size[1]) - self.actualBottomMargin
 
         image.paste(imageHistogram, (paste_x, paste_y), imageHistogram)
         return image
 
-    def imageResize(self, image):
-        self.imageWidth = image.size[0]
-        self.imageHeight = image.size[1]
+    def thumbnailSize(self, size):
+        self.imageWidth = size[0]
+        self.imageHeight = size[1]
 
-        imageRatio = image.size[1] / float(image.size[0])
+        imageRatio = size[1] / float(size[0])
 
-        if image.size[0] < image.size[1]:
+        if size[0] < size[1]:
             self.imageHeight = self.contactSheetConfiguration["contactSheetWidth"]
             self.imageWidth = int(self.imageHeight / imageRatio)
         else:
             self.imageWidth = self.contactSheetConfiguration["contactSheetWidth"]
-            self.imageHeight = int((image.size[1] * self.imageWidth) // image.size[0])
+            self.imageHeight = int((size[1] * self.imageWidth) // size[0])
+
+        return self.imageWidth, self.imageHeight
 
-        image = image.resize((self.imageWidth, self.imageHeight), Image.Resampling.LANCZOS)
+    def imageResize(self, image, size=None):
+        if size is None:
+            size = self.thumbnailSize(image.size)
+
+        # reducing_gap lets Pillow box-reduce by an integer factor first and
+        # only run LANCZOS over the last 2x, as thumbnail() does
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
         return image
 
-    def makeThumb(self, file):
-        expandPercent = self.contactSheetConfiguration["expandPercent"]
-        sharpenAmount = self.contactSheetConfiguration["sharpenAmount"]
+    def isToolAvailable(self, name):
+        """Check for an external tool the first time it is actually needed"""
+        if name not in self.toolAvailable:
+            tool, ok, message = probe_tool(name, self.contactSheetConfiguration.get('strictToolCheck', False))
+            if not ok or message.startswith("Warning"):
+                print(message)
+            self.toolAvailable[name] = ok
+        return self.toolAvailable[name]
+
+    def runDcraw(self, dcraw_opts):
+        """Run dcraw and decode its output as it streams in, or return None on failure"""
+        if not self.isToolAvailable('dcraw'):
+            raise RuntimeError("dcraw is required for RAW file processing. Install with: brew install dcraw")
+        print(f"Running: {' '.join(dcraw_opts)}")
+        try:
+            proc = subprocess.Popen(dcraw_opts, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"dcraw failed: {e}")
+            return None
+
+        # Reading the pipe blocks, so kill dcraw if it hangs
+        watchdog = threading.Timer(60, proc.kill)
+        watchdog.start()
+        try:
+            chunk = proc.stdout.read(1 << 20)
+            if chunk.startswith((b"P5", b"P6")):
+                # Feed the PPM to the decoder in chunks so the full bitmap is never buffered
+                parser = ImageFile.Parser()
+                while chunk:
+                    parser.feed(chunk)
+                    chunk = proc.stdout.read(1 << 20)
+                image = parser.close()
+            else:
+                # Embedded JPEG previews are small; keep them lazy so draft() still applies
+                image = Image.open(BytesIO(chunk + proc.stdout.read()))
+        except OSError:
+            image = None
+        finally:
+            watchdog.cancel()
+            proc.stdout.close()
+            proc.wait()
+
+        if proc.returncode != 0:
+            return None
+        return image
+
+    def readRawPreview(self, file):
+        """Extract a RAW file's embedded preview in-process with rawpy, or return None"""
+        if rawpy is None:
+            return None
+        try:
+            with rawpy.imread(file) as raw:
+                thumb = raw.extract_thumb()
+        except Exception:
+            return None
+        if thumb.format == rawpy.ThumbFormat.JPEG:
+            # Keep it lazy so draft() still applies
+            return Image.open(BytesIO(thumb.data))
+        return Image.fromarray(thumb.data)
+
+    def orientPreview(self, image):
+        """Rotate or flip an embedded RAW preview by the EXIF Orientation read for its file"""
+        value = str(self.ExifTags.get("EXIF_orientation", "")).strip()
+        orientation = EXIV2_ORIENTATION.get(value.lower())
+        if orientation is None:
+            try:
+                orientation = int(value)
+            except ValueError:
+                return image
 
+        transpose = ORIENTATION_TRANSPOSE.get(orientation)
+        if transpose is None:
+            return image
+        return image.transpose(transpose)
+
+    def draftSize(self):
+        """Smallest JPEG decode size that still serves the thumbnail and, if enabled, the export"""
+        # Keep at least 2x headroom over the final resize
+        size = self.contactSheetConfiguration["contactSheetWidth"] * 2
+        if self.contactSheetConfiguration.get('export2000px', False):
+            size = max(size, 4000)
+        return size
+
+    def decodeImage(self, file):
+        """Open or decode a file into a loaded PIL image"""
+        self.decodedPreview = False
         if file.lower().endswith((".jpg", ".jpeg")):
             image = Image.open(file)
+            # Let libjpeg scale down during decode (1/2, 1/4, 1/8)
+            image.draft('RGB', (self.draftSize(), self.draftSize()))
+        elif file.lower().endswith((".tif", ".tiff")) and not self.isToolAvailable('dcraw'):
+            image = Image.open(file)
         elif file.lower().endswith((".tif", ".tiff")):
             # Extract from TIFF using dcraw
-            dcraw_opts = ["dcraw", "-c", "-4", "-T", file]
-            print(f"Running: {' '.join(dcraw_opts)}")
-            try:
-                result = subprocess.run(dcraw_opts, capture_output=True, timeout=60)
-                if result.returncode == 0:
-                    rawImage = BytesIO(result.stdout)
-                    image = Image.open(rawImage)
-                else:
-                    # Fallback to direct PIL open
-                    image = Image.open(file)
-            except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
+            image = self.runDcraw(["dcraw", "-c", "-4", "-T", file])
+            if image is None:
+                # Fallback to direct PIL open
                 print(f"dcraw failed for {file}, trying direct open")
                 image = Image.open(file)
-        elif file.lower().endswith((".cr2", ".cr3", ".nef", ".arw", ".dng", ".raf", ".orf", ".rw2", ".pef", ".srw")):
-            # Extract from RAW using dcraw
-            dcraw_opts = ["dcraw", "-c", file]
-            print(f"Running: {' '.join(dcraw_opts)}")
+        elif file.lower().endswith(RAW_EXTENSIONS):
+            image = None
             try:
-                result = subprocess.run(dcraw_opts, capture_output=True, timeout=60)
-                if result.returncode == 0:
-                    rawImage = BytesIO(result.stdout)
-                    image = Image.open(rawImage)
-                else:
-                    raise Exception(f"dcraw failed with return code {result.returncode}")
-            except (subprocess.TimeoutExpired, subprocess.CalledProcessError, Exception) as e:
-                print(f"Error processing RAW file {file}: {e}")
+                if self.contactSheetConfiguration["useEmbeddedJpg"]:
+                    # The embedded preview skips demosaicing entirely
+                    image = self.readRawPreview(file)
+                    if image is None:
+                        image = self.runDcraw(["dcraw", "-e", "-c", file])
+                    if image is not None:
+                        image.draft('RGB', (self.draftSize(), self.draftSize()))
+                        if max(image.size) < self.contactSheetConfiguration["contactSheetWidth"]:
+                            # Preview is too small for the contact sheet
+                            image = None
+                        else:
+                            self.decodedPreview = True
+                    if image is None:
+                        # Half-size demosaic still produces far more pixels than needed
+                        image = self.runDcraw(["dcraw", "-c", "-h", file])
+                if image is None:
+                    # Extract from RAW using dcraw
+                    image = self.runDcraw(["dcraw", "-c", file])
+            except RuntimeError as e:
+                # rawpy couldn't serve a preview and dcraw isn't installed
+                print(f"Error: {e}")
+            if image is None:
+                print(f"Error processing RAW file {file}: dcraw failed")
                 # Create a placeholder image
                 image = Image.new('RGB', (800, 600), 'gray')
                 draw = ImageDraw.Draw(image)
@@ -1118,26 +1398,43 @@ class ContactSheetGenerator(object):
                 print(f"Error opening {file}: {e}")
                 image = Image.new('RGB', (800, 600), 'gray')
 
-        # Rotate portrait images to landscape orientation
-        if image.size[1] > image.size[0]:  # Height > Width = Portrait
-            image = image.rotate(90, expand=True)
-            print(f"Rotated portrait image to landscape: {os.path.basename(file)}")
+        # Force the decode here so it runs wherever this method is called
+        image.load()
+        return image
+
+    def makeThumb(self, file, image=None):
+        expandPercent = self.contactSheetConfiguration["expandPercent"]
+        sharpenAmount = self.contactSheetConfiguration["sharpenAmount"]
 
-        # Generate histogram before resizing
-        imageHistogram = self.imageHistogram(image)
+        if image is None:
+            image = self.decodeImage(file)
 
-        # Resize image
-        image = self.imageResize(image)
+        # Portrait images are rotated to landscape, but only after the downscale
+        portrait = image.size[1] > image.size[0]  # Height > Width = Portrait
+        landscapeSize = (image.size[1], image.size[0]) if portrait else image.size
 
-        # Calculate margin
-        if image.size[0] > image.size[1]:
-            self.imageMargin = (image.size[0] // 100) * self.contactSheetConfiguration["expandPercent"]
+        # Plan the expanded canvas first so the image is resampled only once,
+        # straight to the size it will have on the canvas
+        thumbWidth, thumbHeight = self.thumbnailSize(landscapeSize)
+        layout = self.canvasLayout(thumbWidth, thumbHeight, expandPercent)
+        if portrait:
+            image = self.imageResize(image, (layout[1], layout[0]))
+            image = image.transpose(Image.Transpose.ROTATE_90)
+            print(f"Rotated portrait image to landscape: {os.path.basename(file)}")
         else:
-            self.imageMargin = (image.size[1] // 100) * self.contactSheetConfiguration["expandPercent"]
+            image = self.imageResize(image, layout[:2])
+
+        # Take the histogram from the thumbnail, before any effects, and only when it will be shown;
+        # the downscaled frame has the same tonal distribution without rescanning the full decode
+        imageHistogram = None
+        if self.contactSheetConfiguration["histogramInfo"]:
+            imageHistogram = self.imageHistogram(image)
 
-        # Store original image dimensions before expansion
-        self.imageWidth = image.size[0]
-        self.imageHeight = image.size[1]
+        # Calculate margin
+        if thumbWidth > thumbHeight:
+            self.imageMargin = (thumbWidth // 100) * self.contactSheetConfiguration["expandPercent"]
+        else:
+            self.imageMargin = (thumbHeight // 100) * self.contactSheetConfiguration["expandPercent"]
 
         # Apply effects
         if self.contactSheetConfiguration["expandHistogram"]:
@@ -1146,32 +1443,235 @@ class ContactSheetGenerator(object):
         if self.contactSheetConfiguration["sharpen"]:
             image = self.imageSharpen(image, sharpenAmount)
 
-        # Store dimensions before expansion (in case image gets scaled)
-        pre_expansion_width = image.size[0]
-
-        image = self.imageCanvasExpand(image, expandPercent)
-        image = self.imageWriteExif(image, file, pre_expansion_width)
+        image = self.imageCanvasExpand(image, expandPercent, layout)
+        # Text layout uses the width before the canvas scale-down
+        image = self.imageWriteExif(image, file, thumbWidth)
 
         if self.contactSheetConfiguration["histogramInfo"]:
             image = self.pasteHistogram(image, imageHistogram)
 
         return image
 
+@lru_cache(maxsize=None)
+def find_font_path():
+    """Resolve the overlay font file once per process, or None to use PIL's default font"""
+    # fontconfig resolves the whole preference list in one call
+    try:
+        result = subprocess.run(["fc-match", "-f", "%{file}", "Iosvmata,Menlo,Monaco,Arial"],
+                                capture_output=True, text=True, timeout=5)
+        if result.returncode == 0 and os.path.exists(result.stdout):
+            return result.stdout
+    except (subprocess.TimeoutExpired, OSError):
+        pass
+
+    # Without fontconfig (stock macOS), try Iosvmata or fallback to system fonts
+    font_paths = [
+        "/System/Library/Fonts/Iosvmata.ttf",
+        "/Library/Fonts/Iosvmata.ttf",
+        "/usr/local/share/fonts/Iosvmata.ttf",
+        "/opt/homebrew/share/fonts/Iosvmata.ttf",
+        "/System/Library/Fonts/Menlo.ttc",
+        "/System/Library/Fonts/Monaco.ttf",
+        "/System/Library/Fonts/Arial.ttf"
+    ]
+
+    for font_path in font_paths:
+        if os.path.exists(font_path):
+            try:
+                ImageFont.truetype(font_path)
+                return font_path
+            except OSError:
+                continue
+
+    return None
+
+def parse_exif_date(date_str):
+    """Parse an EXIF "YYYY:MM:DD HH:MM:SS" timestamp by slicing, much faster than strptime"""
+    return datetime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+                    int(date_str[11:13]), int(date_str[14:16]), int(date_str[17:19]))
+
+# Ordinal suffix for each day of the month, indexed by day number (11th-13th included)
+DAY_SUFFIX = [''] + ['st', 'nd', 'rd'] + ['th'] * 17 + ['st', 'nd', 'rd'] + ['th'] * 7 + ['st']
+
+@lru_cache(maxsize=256)
+def format_exif_date(date_str):
+    """Format an EXIF timestamp as "May 6th, 2025", or return it unchanged if it doesn't parse"""
+    try:
+        dt = parse_exif_date(date_str)
+    except ValueError:
+        return date_str
+
+    day = dt.day
+    return dt.strftime(f"%B {day}{DAY_SUFFIX[day]}, %Y")
+
+@lru_cache(maxsize=None)
+def make_gallery_dir(path):
+    """Create a gallery folder, at most once per process"""
+    try:
+        os.makedirs(path)
+        print(f"Created directory: {path}")
+    except FileExistsError:
+        pass
+
+@lru_cache(maxsize=1024)
+def measure_text(fontPath, fontSize, text):
+    """Return the (width, height) of a string's ink box in the overlay font"""
+    font = load_font(fontPath, fontSize)
+    try:
+        bbox = font.getbbox(text)
+        return bbox[2] - bbox[0], bbox[3] - bbox[1]
+    except:
+        # Fallback for older PIL versions
+        return font.getsize(text)
+
+@lru_cache(maxsize=32)
+def load_font(fontPath, fontSize):
+    """Load a font once per path and size"""
+    if fontPath is None:
+        return ImageFont.load_default()
+    return ImageFont.truetype(fontPath, fontSize)
+
+def process_one(fileName, frame, cachedExif, config, isProcessingFolder, toolAvailable):
+    """Process a single file in a worker process and return its HTML and contact sheet entries and EXIF"""
+    # Reuse the parent's tool checks rather than probing again in every worker
+    ContactSheetGenerator.toolAvailable.update(toolAvailable)
+    generator = ContactSheetGenerator("", config)
+    generator.isProcessingFolder = isProcessingFolder
+    generator.frameCounter = frame
+    generator.cachedExif = cachedExif
+    generator.processFile(fileName)
+    return generator.htmlImages, generator.contactSheetImages, generator.ExifTags
+
+def probe_tool(tool, strict=False):
+    """Check that an external tool is on PATH, returning (tool, ok, message)"""
+    path = find_executable(tool)
+    if path is None:
+        message = f"✗ {tool} not found. Install with: brew install {tool}"
+        if tool == 'dcraw':
+            message += "\n  dcraw is required for RAW file processing"
+        return tool, False, message
+
+    message = ""
+    # Only run the binary itself when asked to; finding it on PATH is enough otherwise
+    if strict and tool == 'dcraw':
+        # A binary that already passed at this path and mtime doesn't need running again
+        key = f"{path}:{os.stat(path).st_mtime_ns}"
+        cache = load_tool_cache()
+        if cache.get(tool) != key:
+            # Starting cleanly is enough; the banner itself isn't needed
+            try:
+                subprocess.run([path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
+                working = True
+            except (OSError, subprocess.TimeoutExpired):
+                working = False
+            if working:
+                cache[tool] = key
+                save_tool_cache(cache)
+            else:
+                message = f"Warning: {tool} not found or not working properly\n"
+    return tool, True, message + f"✓ {tool} is available"
+
+@lru_cache(maxsize=None)
+def path_executables():
+    """Scan PATH once, mapping each file name to where it appears, in PATH order"""
+    found = {}
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        try:
+            with os.scandir(directory or ".") as entries:
+                for entry in entries:
+                    found.setdefault(entry.name, []).append(entry.path)
+        except OSError:
+            continue
+    return found
+
+def find_executable(tool):
+    """Find a tool like shutil.which does, from one shared scan of PATH"""
+    # Windows needs PATHEXT handling, which shutil.which already does
+    if os.name == 'nt':
+        return shutil.which(tool)
+    for path in path_executables().get(tool, []):
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+@lru_cache(maxsize=None)
+def exiftool_process():
+    """Start one exiftool per process and keep it open for every file, or return None without exiftool"""
+    path = find_executable('exiftool')
+    if path is None:
+        return None
+    try:
+        proc = subprocess.Popen([path, '-stay_open', 'True', '-@', '-', '-common_args', '-S', '-n'],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, encoding='utf-8', errors='replace')
+    except OSError:
+        return None
+    atexit.register(close_exiftool, proc)
+    return proc
+
+def close_exiftool(proc):
+    """Ask a stay_open exiftool to exit"""
+    try:
+        proc.stdin.write("-stay_open\nFalse\n")
+        proc.stdin.close()
+        proc.wait(timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        proc.kill()
+
+def load_tool_cache():
+    """Load the tool checks that passed on earlier runs"""
+    try:
+        with open(TOOL_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_tool_cache(cache):
+    """Remember passing tool checks for later runs; failing to write is harmless"""
+    try:
+        os.makedirs(os.path.dirname(TOOL_CACHE_PATH), exist_ok=True)
+        # Write a private temp file and swap it in, so a concurrent run never reads a partial file
+        tmpPath = f"{TOOL_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmpPath, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmpPath, TOOL_CACHE_PATH)
+    except OSError:
+        pass
+
+def check_pillow_build():
+    """Report whether the SIMD-accelerated Pillow and libjpeg builds are installed"""
+    import PIL
+    from PIL import features
+    # Pillow-SIMD versions carry a ".postN" suffix, e.g. 9.5.0.post1
+    if 'post' in PIL.__version__:
+        print(f"✓ Pillow-SIMD {PIL.__version__} is available")
+    else:
+        print(f"Warning: using stock Pillow {PIL.__version__}; install pillow-simd for faster resize and sharpening")
+
+    if features.check_feature('libjpeg_turbo'):
+        print(f"✓ libjpeg-turbo {features.version_feature('libjpeg_turbo')} is available")
+    else:
+        print("Warning: Pillow is not linked against libjpeg-turbo; JPEG decode and encode will be slower")
+
 def main():
     parser = argparse.ArgumentParser(description='Generate contact sheets from RAW and image files')
     parser.add_argument('input', help='Input directory or file')
     parser.add_argument('-w', '--width', type=int, default=600, help='Contact sheet width (default: 600)')
-    parser.add_argument('-q', '--quality', type=int, default=95, help='JPEG quality (default: 95)')
+    parser.add_argument('-q', '--quality', type=int, default=85, help='Contact sheet JPEG quality (default: 85)')
     parser.add_argument('--histogram', action='store_true', help='Enable histogram overlay')
     parser.add_argument('--custom-text', action='store_true', help='Enable custom text overlay')
     parser.add_argument('--no-exif', action='store_true', help='Disable EXIF information display')
     parser.add_argument('--no-sharpen', action='store_true', help='Disable image sharpening')
+    parser.add_argument('--sharpen-amount', type=float, default=1, help='Sharpening strength, 0 disables it (default: 1)')
+    parser.add_argument('--full-decode', action='store_true', help='Demosaic RAW files instead of using their embedded JPEG preview')
     parser.add_argument('--show-filename', action='store_true', help='Show filename instead of date at top of image')
     parser.add_argument('--rename', action='store_true', help='Rename output files to frame numbers')
     parser.add_argument('--export', action='store_true', help='Export 2000px wide JPEGs of input files')
     parser.add_argument('--html', action='store_true', help='Generate HTML contact sheet with lightbox (automatically enables --export)')
     parser.add_argument('--png', action='store_true', help='Generate a single PNG contact sheet image with all frames')
+    parser.add_argument('--sheet-format', choices=['png', 'jpeg'], default='png', help='File format for the --png contact sheet (default: png)')
 
+    parser.add_argument('--strict', action='store_true', help='Run dcraw before first use to verify it works, not just that it is installed')
     parser.add_argument('--gallery-name', type=str, default='Contact Sheet', help='Name for the HTML gallery (default: Contact Sheet)')
 
     args = parser.parse_args()
@@ -1193,37 +1693,22 @@ def main():
         'JPG_Quality': args.quality,
         'histogramInfo': args.histogram,
         'sharpen': not args.no_sharpen,
+        'sharpenAmount': args.sharpen_amount,
+        'useEmbeddedJpg': not args.full_decode,
         'showFilename': args.show_filename,
         'renameFrames': args.rename,
         'export2000px': args.export,
         'generateHTML': args.html,
         'generateContactSheet': args.png,
-        'galleryName': args.gallery_name
+        'contactSheetFormat': args.sheet_format,
+        'galleryName': args.gallery_name,
+        'strictToolCheck': args.strict,
+        'showExif': not args.no_exif,
+        'ExifTagsShow': {'customText': args.custom_text}
     }
 
-    # Handle custom text
-    if not args.custom_text:
-        config['ExifTagsShow'] = {'customText': False}
-
-    # Disable EXIF if requested
-    if args.no_exif:
-        config['ExifTagsShow'] = {key: False for key in config.get('ExifTagsShow', {})}
-
-    # Check if dcraw and exiv2 are available
-    for tool in ['dcraw', 'exiv2']:
-        try:
-            if tool == 'dcraw':
-                result = subprocess.run([tool], capture_output=True, text=True, timeout=5)
-                if 'dcraw' not in result.stdout:
-                    print(f"Warning: {tool} not found or not working properly")
-            else:
-                subprocess.run([tool, '--version'], capture_output=True, check=True, timeout=5)
-            print(f"✓ {tool} is available")
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-            print(f"✗ {tool} not found. Install with: brew install {tool}")
-            if tool == 'dcraw':
-                print("  dcraw is required for RAW file processing")
-                return 1
+    # dcraw and exiv2 are checked by the generator the first time a file needs them
+    check_pillow_build()
 
     print(f"\nProcessing: {args.input}")
     print(f"Settings: Width={args.width}, Quality={args.quality}, Histogram={args.histogram}, ContactSheet={args.png}")